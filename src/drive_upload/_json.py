@@ -0,0 +1,31 @@
+"""JSON parsing and serialization, using orjson when it is installed."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this covers
+# malformed JSON from either parser. Without orjson, undecodable bytes
+# raise UnicodeDecodeError instead; callers parsing bytes must catch it too.
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: str | bytes) -> Any:
+    """Parse a JSON document from *data*."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, *, indent: bool = False) -> str:
+    """Serialize *obj* to a JSON string, indented by two spaces if *indent*."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
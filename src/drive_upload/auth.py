@@ -1,26 +1,75 @@
 """OAuth logic and token management for Google Drive API."""
 
-import json
+from __future__ import annotations
+
+import functools
 import os
+import shlex
 import sys
+import tempfile
+from typing import TYPE_CHECKING
+
+from drive_upload import _json
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
+if TYPE_CHECKING:
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
 
 # Only request access to files created/opened by this app.
 SCOPES = ["https://www.googleapis.com/auth/drive.file"]
 
 _TOKEN_FILENAME = "token.json"
 
+# Fields needed to refresh a directly supplied token.
+_REFRESH_FIELDS = ("refresh_token", "client_id", "client_secret")
+
+# Transport shared by all token refreshes; see _refresh_request().
+_REQUEST: Request | None = None
+
 
 def _resolve_token_path(credentials_path: str) -> str:
     """Store token.json alongside the credentials file."""
     return os.path.join(os.path.dirname(os.path.abspath(credentials_path)), _TOKEN_FILENAME)
 
 
+def _refresh_request() -> Request:
+    """Return the shared transport used to refresh tokens.
+
+    Reusing one Request keeps its requests.Session, so repeated refreshes
+    reuse pooled connections instead of a new TLS handshake each time.
+    """
+    global _REQUEST
+    if _REQUEST is None:
+        from google.auth.transport.requests import Request
+
+        _REQUEST = Request()
+    return _REQUEST
+
+
+def _save_token(token_path: str, token_json: str) -> None:
+    """Atomically write *token_json* to *token_path*.
+
+    The new contents go to a temporary file that then replaces the old
+    one, so an interrupted write never leaves a truncated token.json.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(token_path), prefix=".token-", suffix=".json",
+    )
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(token_json.encode())
+        os.replace(tmp_path, token_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@functools.lru_cache(maxsize=1)
 def _is_headless() -> bool:
-    """Best-effort detection of a headless (no-display) environment."""
+    """Best-effort detection of a headless (no-display) environment.
+
+    Cached, since the environment does not change during a CLI run.
+    """
     # Check for common headless indicators
     if os.environ.get("SSH_CONNECTION") or os.environ.get("SSH_CLIENT"):
         return True
@@ -29,61 +78,88 @@ def _is_headless() -> bool:
     return not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY")
 
 
-def authenticate(credentials_path: str) -> Credentials:
+def parse_token(raw: str) -> dict:
+    """Parse a JSON token string, exiting with an error if it is malformed."""
+    try:
+        return _json.loads(raw)
+    except _json.JSONDecodeError as e:
+        print(f"Invalid JSON in token: {e}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+def authenticate(credentials_path: str, token_dict: dict | None = None) -> Credentials:
     """Return valid Google OAuth2 credentials.
 
-    Loads cached tokens from token.json if available. Falls back to the
-    full OAuth consent flow when no valid token exists.
+    Uses *token_dict* or the GOOGLE_DRIVE_TOKEN environment variable when
+    a token is supplied directly. Otherwise loads cached tokens from
+    token.json if available, falling back to the full OAuth consent flow
+    when no valid token exists.
 
     Args:
         credentials_path: Path to the credentials.json file downloaded
             from the Google Cloud Console.
+        token_dict: Already-parsed token data, e.g. from a token file
+            passed on the command line.
 
     Returns:
         An authenticated Credentials object ready for API calls.
     """
-    # Check if token is provided directly via environment variable
-    direct_token = os.environ.get("GOOGLE_DRIVE_TOKEN")
-    if direct_token:
+    from google.oauth2.credentials import Credentials
+
+    # Fall back to a token provided via environment variable
+    if token_dict is None:
+        direct_token = os.environ.get("GOOGLE_DRIVE_TOKEN")
+        if direct_token:
+            token_dict = parse_token(direct_token)
+
+    if token_dict is not None:
         print("Using provided token.", file=sys.stderr)
-        try:
-            token_data = json.loads(direct_token)
-        except json.JSONDecodeError as e:
-            print(f"Invalid JSON in token: {e}", file=sys.stderr)
-            raise SystemExit(1)
 
-        # Build Credentials directly from the token fields
-        access_token = token_data.get("access_token") or token_data.get("token")
-        if not access_token:
+        # Accept "access_token" as an alias for the "token" field
+        token_info = dict(token_dict)
+        token_info["token"] = token_info.get("token") or token_info.get("access_token")
+        if not token_info["token"]:
             print("Token must contain 'access_token' or 'token' field.", file=sys.stderr)
             raise SystemExit(1)
 
-        creds = Credentials(
-            token=access_token,
-            refresh_token=token_data.get("refresh_token"),
-            token_uri=token_data.get("token_uri", "https://oauth2.googleapis.com/token"),
-            client_id=token_data.get("client_id"),
-            client_secret=token_data.get("client_secret"),
-            scopes=SCOPES,
-        )
+        if all(token_info.get(key) for key in _REFRESH_FIELDS):
+            creds = Credentials.from_authorized_user_info(token_info, SCOPES)
+            # from_authorized_user_info always uses Google's token endpoint and
+            # marks tokens without an "expiry" as already expired. Keep a
+            # supplied token_uri, and leave a missing expiry unknown so the
+            # token is used as-is and only refreshed if the API rejects it.
+            expiry = creds.expiry if token_info.get("expiry") else None
+            if token_info.get("token_uri"):
+                creds = creds.with_token_uri(token_info["token_uri"])
+            creds.expiry = expiry
+        else:
+            # A bare access token works until it expires but cannot be refreshed
+            creds = Credentials(token=token_info["token"], scopes=SCOPES)
 
         # If token has client credentials and is expired, try refreshing
-        if not creds.valid and creds.expired and creds.refresh_token and creds.client_id:
+        if creds.expired and creds.refresh_token and creds.client_id:
             print("Token expired, refreshing...", file=sys.stderr)
-            creds.refresh(Request())
+            creds.refresh(_refresh_request())
 
         return creds
 
     token_path = _resolve_token_path(credentials_path)
     creds: Credentials | None = None
 
-    if os.path.exists(token_path):
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    try:
+        with open(token_path, "rb") as token_file:
+            token_info = _json.loads(token_file.read())
+    except FileNotFoundError:
+        pass
+    else:
+        creds = Credentials.from_authorized_user_info(token_info, SCOPES)
 
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
+            creds.refresh(_refresh_request())
         else:
+            from google_auth_oauthlib.flow import InstalledAppFlow
+
             flow = InstalledAppFlow.from_client_secrets_file(credentials_path, SCOPES)
             
             if _is_headless():
@@ -140,11 +216,12 @@ def authenticate(credentials_path: str) -> Credentials:
                         ),
                     )
 
-        with open(token_path, "w") as token_file:
-            token_file.write(creds.to_json())
+        token_json = creds.to_json()
+        _save_token(token_path, token_json)
         
         # Display the token for manual use in headless environments
         if _is_headless():
+            export_line = "export GOOGLE_DRIVE_TOKEN=" + shlex.quote(token_json)
             print(
                 "\n" + "="*50,
                 file=sys.stderr,
@@ -152,9 +229,9 @@ def authenticate(credentials_path: str) -> Credentials:
             print(
                 "✅ AUTHENTICATION SUCCESSFUL!"
                 "\n\nFor future use on headless servers, set this environment variable:"
-                "\nexport GOOGLE_DRIVE_TOKEN='" + creds.to_json().replace("'", "'\"'\"'") + "'"
+                "\n" + export_line +
                 "\n\nOr save it to a file and source it:"
-                "\necho \"export GOOGLE_DRIVE_TOKEN='" + creds.to_json().replace("'", "'\"'\"'") + "'\" > ~/drive_token.env"
+                "\necho " + shlex.quote(export_line) + " > ~/drive_token.env"
                 "\nsource ~/drive_token.env"
                 "\n" + "="*50,
                 file=sys.stderr,
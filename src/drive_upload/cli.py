@@ -3,14 +3,17 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import os
+import stat
 import sys
-
-from drive_upload.auth import authenticate
-from drive_upload.uploader import upload
+from pathlib import Path
 
 
+@functools.lru_cache(maxsize=1)
 def _build_parser() -> argparse.ArgumentParser:
+    # Cached: parse_args() does not mutate the parser, so repeated main()
+    # calls can share one instance.
     parser = argparse.ArgumentParser(
         prog="upload-drive",
         description="Upload a file or directory to Google Drive.",
@@ -41,9 +44,43 @@ def _build_parser() -> argparse.ArgumentParser:
             "If provided, --credentials is ignored (except for 'generate')."
         ),
     )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help=(
+            "Deflate files when zipping a directory. By default files are "
+            "stored as-is, which is faster for already-compressed data."
+        ),
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=None,
+        metavar="N",
+        help=(
+            "Upload a directory file by file with N concurrent workers, "
+            "recreating it as a Drive folder instead of zipping it. "
+            "Has no effect when the source is a single file."
+        ),
+    )
     return parser
 
 
+def _is_regular_file(path: str) -> bool:
+    """Return True if *path* names a regular file, using a single stat()."""
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return False
+
+
+def _require_credentials_file(credentials_path: str) -> None:
+    """Exit with an error unless *credentials_path* is an existing file."""
+    if not _is_regular_file(credentials_path):
+        print(f"Error: credentials file not found: {credentials_path}", file=sys.stderr)
+        raise SystemExit(1)
+
+
 def _resolve_credentials(cli_value: str | None) -> str:
     """Return the credentials path, checking the CLI flag first, then the env var."""
     if cli_value:
@@ -67,32 +104,38 @@ def main(argv: list[str] | None = None) -> None:
     parser = _build_parser()
     args = parser.parse_args(argv)
 
+    # Deferred so --help and argument errors never load the Google SDK.
+    from drive_upload.auth import authenticate, parse_token
+
     # Handle token generation mode
     if args.token == "generate":
+        from drive_upload import _json
+
         if not args.credentials:
             credentials_path = _resolve_credentials(None)
         else:
             credentials_path = args.credentials
         
-        if not os.path.isfile(credentials_path):
-            print(f"Error: credentials file not found: {credentials_path}", file=sys.stderr)
-            raise SystemExit(1)
-        
-        print("Generating OAuth token...", file=sys.stderr)
-        creds = authenticate(credentials_path)
-        
-        # Read client info from credentials.json
-        import json
-        with open(credentials_path, "r") as f:
-            client_config = json.load(f)
+        _require_credentials_file(credentials_path)
         
-        client_info = client_config.get("installed") or client_config.get("web")
+        # Read client info from credentials.json in a single read, and
+        # before authenticating so a malformed file fails fast
+        try:
+            client_config = _json.loads(Path(credentials_path).read_bytes())
+        except (_json.JSONDecodeError, UnicodeDecodeError):
+            client_config = None
+        client_info = None
+        if isinstance(client_config, dict):
+            client_info = client_config.get("installed") or client_config.get("web")
         if not client_info:
             print("Error: Invalid credentials.json format", file=sys.stderr)
             raise SystemExit(1)
+
+        print("Generating OAuth token...", file=sys.stderr)
+        creds = authenticate(credentials_path)
         
         # Get the raw OAuth token data and add client credentials
-        token_data = json.loads(creds.to_json())
+        token_data = _json.loads(creds.to_json())
         
         # Ensure we have the client credentials required by from_authorized_user_info
         token_data.update({
@@ -103,7 +146,7 @@ def main(argv: list[str] | None = None) -> None:
         # Save complete token.json in current directory
         token_file = "token.json"
         with open(token_file, "w") as f:
-            json.dump(token_data, f, indent=2)
+            f.write(_json.dumps(token_data, indent=True))
         
         print(f"\n✅ Token saved to {token_file}", file=sys.stderr)
         print(f"This file contains your access token and can be reused on headless servers.", file=sys.stderr)
@@ -116,25 +159,30 @@ def main(argv: list[str] | None = None) -> None:
         print("Use --token generate to create a token.json file.", file=sys.stderr)
         raise SystemExit(1)
 
+    if args.parallel is not None and args.parallel < 1:
+        print("Error: --parallel must be at least 1.", file=sys.stderr)
+        raise SystemExit(1)
+
     # Handle token file or direct token
     if args.token:
-        if os.path.isfile(args.token):
+        if _is_regular_file(args.token):
             # Read token from file
             print(f"Using token from file: {args.token}", file=sys.stderr)
             with open(args.token, "r") as f:
-                os.environ["GOOGLE_DRIVE_TOKEN"] = f.read().strip()
+                token_dict = parse_token(f.read())
         else:
             # Direct token JSON string
-            os.environ["GOOGLE_DRIVE_TOKEN"] = args.token
-        
+            token_dict = parse_token(args.token)
+
         # Use dummy credentials path since authenticate() will use the token
-        creds = authenticate("/dev/null")
+        creds = authenticate("/dev/null", token_dict)
     else:
         # Standard credentials-based flow
         credentials_path = _resolve_credentials(args.credentials)
-        if not os.path.isfile(credentials_path):
-            print(f"Error: credentials file not found: {credentials_path}", file=sys.stderr)
-            raise SystemExit(1)
+        _require_credentials_file(credentials_path)
         creds = authenticate(credentials_path)
 
-    upload(args.source, creds)
+    # Only the upload path needs the Drive client and upload helpers.
+    from drive_upload.uploader import upload
+
+    upload(args.source, creds, compress=args.compress, parallel=args.parallel)
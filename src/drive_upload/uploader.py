@@ -2,27 +2,330 @@
 
 from __future__ import annotations
 
+import io
 import mimetypes
 import os
-import shutil
+import stat
 import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Iterator
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaUpload
 
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import Resource
 
-def _zip_directory(source_dir: str) -> str:
-    """Zip a directory and return the path to the resulting archive."""
-    base_name = os.path.normpath(source_dir)
-    archive_path = shutil.make_archive(base_name, "zip", source_dir)
-    return archive_path
+# Size of each resumable upload request, overridable via DRIVE_UPLOAD_CHUNK_MB.
+_DEFAULT_CHUNK_MB = 16
+
+# Drive clients keyed by id() of their credentials. The credentials are kept
+# alongside the client so the id cannot be reused by another object.
+_SERVICE_CACHE: dict[int, tuple[Credentials, Resource]] = {}
+
+_FOLDER_MIMETYPE = "application/vnd.google-apps.folder"
+
+# Common upload types, checked before falling back to the mimetypes database,
+# which is only loaded on the first suffix missing from this table.
+_SUFFIX_MIME = {
+    ".zip": "application/zip",
+    ".gz": "application/gzip",
+    ".tar": "application/x-tar",
+    ".7z": "application/x-7z-compressed",
+    ".pdf": "application/pdf",
+    ".json": "application/json",
+    ".csv": "text/csv",
+    ".txt": "text/plain",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".mp3": "audio/mpeg",
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+    ".mkv": "video/x-matroska",
+}
+
+# Files up to this size skip the resumable session and upload in one request.
+_SIMPLE_UPLOAD_LIMIT = 5 * 1024 * 1024
+
+# Minimum number of seconds between progress line redraws.
+_PROGRESS_INTERVAL = 0.1
+
+# Read size used when copying file contents into the archive.
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _scan_tree(path: str, prefix: str = "") -> Iterator[tuple[os.DirEntry, str]]:
+    """Yield ``(entry, arcname)`` for everything below *path*, depth first.
+
+    Uses ``os.scandir`` so file types come from the directory listing and
+    each entry is stat'ed at most once. Symlinked directories are listed
+    but not descended into, matching ``os.walk``.
+    """
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        arcname = prefix + entry.name
+        if entry.is_dir(follow_symlinks=False):
+            yield entry, arcname + "/"
+            yield from _scan_tree(entry.path, arcname + "/")
+        elif entry.is_dir():
+            # Symlinked directory: list it, but do not follow it.
+            yield entry, arcname + "/"
+        elif entry.is_file():
+            yield entry, arcname
+
+
+def _zip_info(entry: os.DirEntry, arcname: str, compression: int) -> zipfile.ZipInfo:
+    """Build a ZipInfo for *entry* from its cached stat result."""
+    st = entry.stat()
+    date_time = time.localtime(st.st_mtime)[:6]
+    if date_time[0] < 1980:
+        # Zip timestamps cannot represent dates before 1980.
+        date_time = (1980, 1, 1, 0, 0, 0)
+    info = zipfile.ZipInfo(arcname, date_time)
+    info.external_attr = (st.st_mode & 0xFFFF) << 16
+    if arcname.endswith("/"):
+        info.external_attr |= 0x10  # MS-DOS directory flag
+    else:
+        info.file_size = st.st_size
+        info.compress_type = compression
+    return info
+
+
+class _ZipSink:
+    """Write-only, non-seekable target that collects bytes from ZipFile."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+
+class _ZipStream(io.RawIOBase):
+    """Readable stream producing a zip archive of a directory on demand.
+
+    Files are read and archived only as the consumer asks for more bytes,
+    so the archive is never written to disk or held in memory as a whole.
+    """
+
+    def __init__(self, source_dir: str, compression: int = zipfile.ZIP_STORED) -> None:
+        super().__init__()
+        self._sink = _ZipSink()
+        self._chunks = self._generate(source_dir, compression)
+        self._exhausted = False
+
+    def _generate(self, source_dir: str, compression: int) -> Iterator[None]:
+        with zipfile.ZipFile(self._sink, "w", compression, allowZip64=True) as archive:
+            for entry, arcname in _scan_tree(source_dir):
+                info = _zip_info(entry, arcname, compression)
+                if info.is_dir():
+                    archive.writestr(info, b"")
+                    yield
+                    continue
+                with open(entry.path, "rb") as src, archive.open(info, "w") as dest:
+                    while True:
+                        block = src.read(_COPY_BUFFER_SIZE)
+                        if not block:
+                            break
+                        dest.write(block)
+                        yield
+        # Closing the archive writes the central directory.
+        yield
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        pending = self._sink.buffer
+        while not pending and not self._exhausted:
+            try:
+                next(self._chunks)
+            except StopIteration:
+                self._exhausted = True
+        n = min(len(b), len(pending))
+        b[:n] = pending[:n]
+        del pending[:n]
+        return n
+
+
+class _StreamUpload(MediaUpload):
+    """Resumable upload of a non-seekable stream whose length is unknown.
+
+    ``MediaIoBaseUpload`` needs a seekable stream to learn the total size
+    up front. This reads the stream forward instead, keeping only the
+    chunk in flight (for retries) plus one chunk of look-ahead so the
+    final size is known by the time the last chunk is sent.
+    """
+
+    def __init__(self, stream: io.RawIOBase, mimetype: str, chunksize: int) -> None:
+        super().__init__()
+        self._stream = stream
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._buffer = bytearray()
+        self._buffer_start = 0
+        self._next_begin = 0
+        self._total: int | None = None
+
+    def _fill(self, end: int) -> None:
+        """Read from the stream until the buffer reaches offset *end* or EOF."""
+        while self._total is None and self._buffer_start + len(self._buffer) < end:
+            block = self._stream.read(end - self._buffer_start - len(self._buffer))
+            if not block:
+                self._total = self._buffer_start + len(self._buffer)
+            else:
+                self._buffer += block
+
+    def chunksize(self) -> int:
+        return self._chunksize
+
+    def mimetype(self) -> str:
+        return self._mimetype
+
+    def size(self) -> int | None:
+        # Look one byte past the next chunk so a final chunk that is exactly
+        # chunksize bytes long is still sent with the total size attached.
+        self._fill(self._next_begin + self._chunksize + 1)
+        return self._total
+
+    def resumable(self) -> bool:
+        return True
+
+    def getbytes(self, begin: int, length: int) -> bytes:
+        if begin < self._buffer_start:
+            raise ValueError("Cannot rewind a streamed upload past the last chunk.")
+        del self._buffer[: begin - self._buffer_start]
+        self._buffer_start = begin
+        self._fill(begin + length)
+        self._next_begin = begin + min(length, len(self._buffer))
+        return bytes(self._buffer[:length])
+
+    def has_stream(self) -> bool:
+        return False
+
+    def to_json(self) -> str:
+        # The archive is generated on the fly and cannot be rebuilt from JSON.
+        raise TypeError("Streamed zip uploads cannot be serialized to JSON.")
+
+
+def _chunk_size() -> int:
+    """Return the resumable upload chunk size in bytes."""
+    value = os.environ.get("DRIVE_UPLOAD_CHUNK_MB")
+    if not value:
+        return _DEFAULT_CHUNK_MB * 1024 * 1024
+    try:
+        chunk_mb = int(value)
+    except ValueError:
+        chunk_mb = 0
+    if chunk_mb <= 0:
+        print(
+            f"Error: DRIVE_UPLOAD_CHUNK_MB must be a positive integer, got {value!r}",
+            file=sys.stderr,
+        )
+        raise SystemExit(1)
+    return chunk_mb * 1024 * 1024
 
 
 def _guess_mimetype(file_path: str) -> str:
     """Return a MIME type for *file_path*, defaulting to octet-stream."""
-    mime, _ = mimetypes.guess_type(file_path)
-    return mime or "application/octet-stream"
+    return (
+        _SUFFIX_MIME.get(os.path.splitext(file_path)[1].lower())
+        or mimetypes.guess_type(file_path)[0]
+        or "application/octet-stream"
+    )
+
+
+def _get_service(creds: Credentials) -> Resource:
+    """Return a Drive v3 client for *creds*, building it only once.
+
+    The bundled static discovery document is used so building the client
+    never fetches the discovery document over HTTP.
+    """
+    cached = _SERVICE_CACHE.get(id(creds))
+    if cached is not None and cached[0] is creds:
+        return cached[1]
+    from googleapiclient.discovery import build
+
+    service = build(
+        "drive", "v3", credentials=creds, cache_discovery=False, static_discovery=True,
+    )
+    _SERVICE_CACHE[id(creds)] = (creds, service)
+    return service
+
+
+def _run_resumable(request, *, http: AuthorizedHttp | None, progress: bool) -> dict:
+    """Send a resumable upload chunk by chunk and return the API response."""
+    response = None
+    last_shown: int | None = None
+    last_time = 0.0
+    while response is None:
+        status, response = request.next_chunk(http=http)
+        if status and progress:
+            # Redraw only when the figure changes, at most ~10 times a second.
+            now = time.monotonic()
+            if status.total_size:
+                shown = int(status.progress() * 100)
+                line = f"\r  Progress: {shown}%"
+            else:
+                shown = status.resumable_progress // (1024 * 1024)
+                line = f"\r  Progress: {shown} MiB"
+            if shown != last_shown and now - last_time >= _PROGRESS_INTERVAL:
+                print(line, end="", flush=True)
+                last_shown, last_time = shown, now
+
+    if progress:
+        print()  # newline after progress
+    return response
+
+
+def _run_upload(
+    creds: Credentials,
+    name: str,
+    media: MediaUpload,
+    *,
+    parent_id: str | None = None,
+    http: AuthorizedHttp | None = None,
+    progress: bool = True,
+) -> str:
+    """Drive an upload to completion and return the new file ID.
+
+    Non-resumable media is sent in a single request without progress output.
+    """
+    service = _get_service(creds)
+
+    body: dict = {"name": name}
+    if parent_id:
+        body["parents"] = [parent_id]
+    request = service.files().create(body=body, media_body=media, fields="id")
+
+    if media.resumable():
+        response = _run_resumable(request, http=http, progress=progress)
+    else:
+        response = request.execute(http=http)
+
+    file_id: str = response["id"]
+    print(f"Upload complete - File ID: {file_id}")
+    return file_id
+
+
+def _create_folder(creds: Credentials, name: str, parent_id: str | None = None) -> str:
+    """Create a Drive folder and return its ID."""
+    body: dict = {"name": name, "mimeType": _FOLDER_MIMETYPE}
+    if parent_id:
+        body["parents"] = [parent_id]
+    folder = _get_service(creds).files().create(body=body, fields="id").execute()
+    return folder["id"]
 
 
 def upload_file(
@@ -30,58 +333,147 @@ def upload_file(
     creds: Credentials,
     *,
     mimetype: str | None = None,
+    parent_id: str | None = None,
+    http: AuthorizedHttp | None = None,
+    progress: bool = True,
+    size: int | None = None,
 ) -> str:
     """Upload a file to Google Drive and return the new file ID.
 
     Uses resumable uploads with a chunked progress display so large
-    files are handled reliably and the user can see progress.
+    files are handled reliably and the user can see progress. Files of
+    at most 5 MiB are sent in one request instead.
+
+    The file is placed in the folder *parent_id* when given. Pass a
+    dedicated *http* transport when uploading from several threads at
+    once, and the file's *size* when it is already known from a stat.
     """
-    service = build("drive", "v3", credentials=creds)
+    from googleapiclient.http import MediaFileUpload
 
     resolved_mime = mimetype or _guess_mimetype(file_path)
-    file_metadata = {"name": os.path.basename(file_path)}
-    media = MediaFileUpload(file_path, mimetype=resolved_mime, resumable=True)
+    if size is None:
+        size = os.path.getsize(file_path)
+    if size <= _SIMPLE_UPLOAD_LIMIT:
+        media = MediaFileUpload(file_path, mimetype=resolved_mime, resumable=False)
+    else:
+        media = MediaFileUpload(
+            file_path, mimetype=resolved_mime, chunksize=_chunk_size(), resumable=True,
+        )
 
     print(f"Uploading {file_path} ({resolved_mime})...")
-    request = service.files().create(
-        body=file_metadata, media_body=media, fields="id",
+    return _run_upload(
+        creds,
+        os.path.basename(file_path),
+        media,
+        parent_id=parent_id,
+        http=http,
+        progress=progress,
     )
 
-    response = None
-    while response is None:
-        status, response = request.next_chunk()
-        if status:
-            pct = int(status.progress() * 100)
-            print(f"\r  Progress: {pct}%", end="", flush=True)
 
-    print()  # newline after progress
-    file_id: str = response["id"]
-    print(f"Upload complete - File ID: {file_id}")
-    return file_id
+def upload_directory(
+    source_dir: str,
+    creds: Credentials,
+    *,
+    compression: int = zipfile.ZIP_STORED,
+) -> str:
+    """Zip a directory on the fly into Google Drive and return the file ID.
+
+    The archive is produced while it is being uploaded, so nothing is
+    written to local disk. Entries are stored uncompressed by default;
+    pass ``zipfile.ZIP_DEFLATED`` as *compression* to compress them.
+    """
+    name = os.path.basename(os.path.normpath(source_dir)) + ".zip"
+    stream = _ZipStream(source_dir, compression)
+    media = _StreamUpload(stream, "application/zip", _chunk_size())
 
+    print(f"Uploading {source_dir} as {name} (application/zip)...")
+    return _run_upload(creds, name, media)
 
-def upload(source_path: str, creds: Credentials) -> None:
-    """Upload a file or directory to Google Drive.
 
-    If source_path is a directory it will be zipped first. The temporary
-    zip is cleaned up after the upload regardless of success or failure.
+def _upload_tree(source_dir: str, creds: Credentials, workers: int = 8) -> str:
+    """Upload a directory file by file and return the new Drive folder ID.
+
+    The directory layout is recreated as Drive folders, then files are
+    uploaded concurrently by *workers* threads. httplib2 connections are
+    not thread-safe, so each thread gets its own authorized transport
+    while the cached Drive client is shared.
     """
-    if not os.path.exists(source_path):
-        print(f"Error: source path does not exist: {source_path}", file=sys.stderr)
-        raise SystemExit(1)
+    import httplib2
+    from google_auth_httplib2 import AuthorizedHttp
+
+    root_name = os.path.basename(os.path.normpath(source_dir))
+    root_id = _create_folder(creds, root_name)
+    # Drive folder IDs keyed by directory path relative to source_dir.
+    folder_ids = {"": root_id}
+    files: list[tuple[str, str, int]] = []
 
-    path_to_upload = source_path
-    temp_zip: str | None = None
+    # _scan_tree yields each directory before its contents and skips
+    # anything that is not a regular file (broken links, FIFOs, sockets).
+    for entry, arcname in _scan_tree(source_dir):
+        rel_dir, _, name = arcname.rstrip("/").rpartition("/")
+        parent_id = folder_ids[rel_dir]
+        if arcname.endswith("/"):
+            folder_ids[arcname.rstrip("/")] = _create_folder(creds, name, parent_id)
+        else:
+            files.append((entry.path, parent_id, entry.stat().st_size))
 
-    if os.path.isdir(source_path):
-        print(f"Directory detected. Zipping {source_path}...")
-        temp_zip = _zip_directory(source_path)
-        path_to_upload = temp_zip
+    local = threading.local()
 
+    def _upload_one(path: str, parent_id: str, size: int) -> str:
+        if not hasattr(local, "http"):
+            local.http = AuthorizedHttp(creds, http=httplib2.Http())
+        return upload_file(
+            path,
+            creds,
+            parent_id=parent_id,
+            http=local.http,
+            progress=False,
+            size=size,
+        )
+
+    print(f"Uploading {len(files)} files with {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_upload_one, *file) for file in files]
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    print(f"Directory upload complete - Folder ID: {root_id}")
+    return root_id
+
+
+def upload(
+    source_path: str,
+    creds: Credentials,
+    *,
+    compress: bool = False,
+    parallel: int | None = None,
+) -> None:
+    """Upload a file or directory to Google Drive.
+
+    If source_path is a directory it is zipped while uploading; set
+    *compress* to deflate the archive entries instead of storing them.
+    With *parallel* set, a directory is instead recreated as a Drive
+    folder and its files are uploaded individually by that many workers.
+    """
     try:
-        mime = "application/zip" if temp_zip else None
-        upload_file(path_to_upload, creds, mimetype=mime)
-    finally:
-        if temp_zip and os.path.exists(temp_zip):
-            os.remove(temp_zip)
-            print(f"Cleaned up temporary zip: {temp_zip}")
+        st = os.stat(source_path)
+    except OSError:
+        print(f"Error: source path does not exist: {source_path}", file=sys.stderr)
+        raise SystemExit(1)
+
+    is_dir = stat.S_ISDIR(st.st_mode)
+    if is_dir and parallel:
+        print(f"Directory detected. Uploading {source_path} file by file...")
+        _upload_tree(source_path, creds, workers=parallel)
+    elif is_dir:
+        print(f"Directory detected. Zipping {source_path} while uploading...")
+        compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        upload_directory(source_path, creds, compression=compression)
+    else:
+        upload_file(source_path, creds, size=st.st_size)